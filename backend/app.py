@@ -1,29 +1,168 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, g, has_app_context, request, jsonify, send_from_directory
+from flask.cli import AppGroup
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session as FlaskSQLAlchemySession
 from flask_cors import CORS
-from flask_jwt_extended import JWTManager, jwt_required, create_access_token, get_jwt_identity
+from flask_jwt_extended import JWTManager, jwt_required, create_access_token, get_jwt_identity, verify_jwt_in_request
+from flask_jwt_extended.exceptions import JWTExtendedException
+from jwt.exceptions import PyJWTError
 from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.utils import secure_filename
 from datetime import datetime, timedelta
+from collections import OrderedDict, defaultdict
 import os
 import uuid
 from PIL import Image
+from serializers import PRODUCT_FIELDS, PRODUCT_VIEWS, FastJSONProvider, product_serializer
 import json
+import csv
+import io
+import gzip
+import hashlib
+import threading
+import sqlite3
+import random
+import socket
+import time
+import signal
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import click
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from urllib.parse import urlencode
+from urllib.request import pathname2url
+from functools import wraps
+from bisect import bisect_right
+import sqlalchemy as sa
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows, cross-process single-flight is then disabled
+    fcntl = None
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'your-secret-key-here'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///jewelry_store.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///jewelry_store.db')
+app.config['SQLALCHEMY_BINDS'] = {  # completed orders
+    'archive': os.environ.get('ARCHIVE_DATABASE_URL', 'sqlite:///jewelry_store_archive.db')
+}
+# Reads in @read_only routes use this replica, or a read-only connection to the primary SQLite file
+app.config['SQLALCHEMY_REPLICA_URI'] = os.environ.get('REPLICA_DATABASE_URL')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['JWT_SECRET_KEY'] = 'jwt-secret-string'
 app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=24)
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+app.config['COMPRESS_MIMETYPES'] = {'application/json', 'text/html', 'text/plain', 'text/css', 'application/javascript'}
+app.config['COMPRESS_MIN_SIZE'] = 500  # bytes, smaller bodies are sent as-is
+app.config['COMPRESS_GZIP_LEVEL'] = 6
+app.config['COMPRESS_BROTLI_QUALITY'] = 5
+app.config['COMPRESS_CACHE_SIZE'] = 256  # compressed bodies kept for anonymous GETs
+app.config['JOB_MAX_ATTEMPTS'] = 5
+app.config['JOB_RETRY_BASE_DELAY'] = 10  # seconds, doubled on every failed attempt
+app.config['JOB_RETRY_MAX_DELAY'] = 3600
+app.config['JOB_LOCK_TIMEOUT'] = 300  # running jobs older than this are handed to another worker
+app.config['JOB_POLL_INTERVAL'] = 1.0
+app.config['LOW_STOCK_THRESHOLD'] = 5
+app.config['CHANGE_FEED_POLL_INTERVAL'] = 0.5  # seconds between checks for events from other processes
+app.config['CHANGE_FEED_BUFFER_SIZE'] = 2000  # recent events kept in memory for live streams
+app.config['CHANGE_FEED_REPLAY_LIMIT'] = 1000  # max events replayed from the table on Last-Event-ID resume
+app.config['CHANGE_FEED_HEARTBEAT'] = 15  # seconds between keep-alive comments
+app.config['CHANGE_FEED_RETENTION_HOURS'] = 72
+app.config['WISHLIST_CACHE_SIZE'] = 10000  # users whose wishlist ids are kept in memory
+app.config['WISHLIST_CACHE_TTL'] = 60  # seconds, bounds staleness across worker processes
+app.config['WISHLIST_SYNC_MAX_ITEMS'] = 500
+app.config['ORDER_ARCHIVE_STATUSES'] = ('delivered', 'cancelled')
+app.config['ORDER_ARCHIVE_AFTER_DAYS'] = 90  # since the order last changed
+app.config['ORDER_ARCHIVE_BATCH_SIZE'] = 200
+app.config['ORDER_ARCHIVE_BATCH_PAUSE'] = 0.05  # seconds between batches so checkout can take the write lock
+app.config['ORDER_BULK_MAX_ROWS'] = 5000
+app.config['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:600000'  # older hashes are upgraded on login
+app.config['PASSWORD_HASH_WORKERS'] = 2  # hashes computed at once, caps CPU spent on auth
+app.config['PASSWORD_HASH_MAX_PENDING'] = 16  # queued hashes beyond this are rejected with 503
+app.config['PASSWORD_HASH_TIMEOUT'] = 5  # seconds a request waits for its hash
+app.config['LOGIN_RATE_LIMIT_PER_IP'] = (20, 60)  # (burst, seconds to refill the burst)
+app.config['LOGIN_RATE_LIMIT_PER_EMAIL'] = (10, 300)
+app.config['REGISTER_RATE_LIMIT_PER_IP'] = (5, 300)
+app.config['RATE_LIMIT_MAX_KEYS'] = 100000
+app.config['CATALOG_CACHE_ENABLED'] = True
+app.config['CATALOG_CACHE_TTL'] = 5  # seconds a catalog response is served as fresh
+app.config['CATALOG_CACHE_STALE_TTL'] = 30  # further seconds it is served while one request refreshes it
+app.config['CATALOG_CACHE_MAX_ENTRIES'] = 1000
+app.config['CATALOG_CACHE_SHARED_DIR'] = os.environ.get('CATALOG_CACHE_SHARED_DIR')  # set to coalesce across processes
+app.config['JSON_BACKEND'] = os.environ.get('JSON_BACKEND', 'auto')  # auto, orjson or json
+app.json = FastJSONProvider(app)
 
 # Ensure upload directory exists
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 os.makedirs(os.path.join(app.config['UPLOAD_FOLDER'], 'products'), exist_ok=True)
 
-db = SQLAlchemy(app)
+class RoutingSession(FlaskSQLAlchemySession):
+    # In @read_only routes, reads for the primary database go to the read engine until the
+    # request writes something; after that it reads from the primary to see its own writes.
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if bind is not None or not has_app_context() or not g.get('db_read_only'):
+            return engine
+        if self._flushing or getattr(clause, 'is_dml', False):
+            g.db_wrote = True
+        if g.get('db_wrote') or engine is not self._db.engines.get(None):
+            return engine
+        return get_read_engine() or engine
+
+db = SQLAlchemy(app, session_options={'class_': RoutingSession})
+
+@event.listens_for(Engine, 'connect')
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL lets the web process and job workers read while one of them writes
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        if not cursor.execute('PRAGMA query_only').fetchone()[0]:
+            cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA busy_timeout=5000')
+        cursor.close()
+
+_read_engine_lock = threading.Lock()
+_read_engines = {}
+
+def create_read_engine():
+    if app.config['SQLALCHEMY_REPLICA_URI']:
+        return sa.create_engine(app.config['SQLALCHEMY_REPLICA_URI'])
+
+    url = db.engines[None].url
+    if url.get_backend_name() != 'sqlite' or url.database in (None, '', ':memory:'):
+        return None
+    path = os.path.abspath(url.database)
+
+    def connect():
+        # mode=ro refuses writes at open time, query_only guards against any that slip through
+        connection = sqlite3.connect(f"file:{pathname2url(path)}?mode=ro", uri=True, check_same_thread=False)
+        connection.execute('PRAGMA query_only=ON')
+        return connection
+
+    return sa.create_engine(url, creator=connect)
+
+def get_read_engine():
+    # Returns None when the primary has no separate read path (e.g. in-memory SQLite)
+    with _read_engine_lock:
+        if app not in _read_engines:
+            _read_engines[app] = create_read_engine()
+        return _read_engines[app]
+
+def read_only(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.db_read_only = True
+        return view(*args, **kwargs)
+    return wrapper
 cors = CORS(app)
 jwt = JWTManager(app)
 
@@ -31,7 +170,7 @@ jwt = JWTManager(app)
 class User(db.Model):
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     email = db.Column(db.String(120), unique=True, nullable=False)
-    password_hash = db.Column(db.String(128), nullable=False)
+    password_hash = db.Column(db.String(255), nullable=False)
     first_name = db.Column(db.String(50), nullable=False)
     last_name = db.Column(db.String(50), nullable=False)
     role = db.Column(db.String(20), default='customer')
@@ -116,6 +255,14 @@ class Order(db.Model):
     # Relationships
     items = db.relationship('OrderItem', backref='order', lazy=True, cascade='all, delete-orphan')
 
+    @property
+    def customer_name(self):
+        return f"{self.user.first_name} {self.user.last_name}"
+
+    @property
+    def customer_email(self):
+        return self.user.email
+
 class OrderItem(db.Model):
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     order_id = db.Column(db.String(36), db.ForeignKey('order.id'), nullable=False)
@@ -126,6 +273,10 @@ class OrderItem(db.Model):
     selected_color = db.Column(db.String(50))
     customization = db.Column(db.Text)
 
+    @property
+    def product_name(self):
+        return self.product.name
+
 class Review(db.Model):
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     product_id = db.Column(db.String(36), db.ForeignKey('product.id'), nullable=False)
@@ -142,6 +293,8 @@ class WishlistItem(db.Model):
     product_id = db.Column(db.String(36), db.ForeignKey('product.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (db.Index('uq_wishlist_item_user_product', 'user_id', 'product_id', unique=True),)
+
 class Coupon(db.Model):
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     code = db.Column(db.String(50), unique=True, nullable=False)
@@ -167,6 +320,75 @@ class Offer(db.Model):
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+class Job(db.Model):
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    name = db.Column(db.String(100), nullable=False)
+    payload = db.Column(db.Text)  # JSON string
+    status = db.Column(db.String(20), default='pending')  # pending, running, done, dead
+    attempts = db.Column(db.Integer, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False)
+    run_at = db.Column(db.DateTime, default=datetime.utcnow)
+    locked_by = db.Column(db.String(100))
+    locked_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (db.Index('ix_job_status_run_at', 'status', 'run_at'),)
+
+class ChangeEvent(db.Model):
+    # The autoincrement id is the feed sequence number (SSE event id)
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    topic = db.Column(db.String(20), nullable=False)  # order, stock, price, catalog
+    type = db.Column(db.String(50), nullable=False)
+    product_id = db.Column(db.String(36))
+    user_id = db.Column(db.String(36))
+    data = db.Column(db.Text)  # JSON string
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = {'sqlite_autoincrement': True}
+
+# Archive of completed orders, kept in a separate SQLite file (see archive_orders).
+# Customer and product names are copied in because the archive cannot join the live tables.
+class ArchivedOrder(db.Model):
+    __bind_key__ = 'archive'
+    __tablename__ = 'order_archive'
+    id = db.Column(db.String(36), primary_key=True)
+    user_id = db.Column(db.String(36), nullable=False, index=True)
+    customer_name = db.Column(db.String(101))
+    customer_email = db.Column(db.String(120))
+    order_number = db.Column(db.String(20), unique=True, nullable=False)
+    status = db.Column(db.String(20))
+    payment_status = db.Column(db.String(20))
+    payment_method = db.Column(db.String(50))
+    subtotal = db.Column(db.Float, nullable=False)
+    shipping = db.Column(db.Float)
+    tax = db.Column(db.Float)
+    discount = db.Column(db.Float)
+    total = db.Column(db.Float, nullable=False)
+    shipping_address = db.Column(db.Text)  # JSON string
+    billing_address = db.Column(db.Text)  # JSON string
+    tracking_number = db.Column(db.String(100))
+    notes = db.Column(db.Text)
+    created_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    items = db.relationship('ArchivedOrderItem', backref='order', lazy=True)
+
+class ArchivedOrderItem(db.Model):
+    __bind_key__ = 'archive'
+    __tablename__ = 'order_item_archive'
+    id = db.Column(db.String(36), primary_key=True)
+    order_id = db.Column(db.String(36), db.ForeignKey('order_archive.id'), nullable=False, index=True)
+    product_id = db.Column(db.String(36), nullable=False)
+    product_name = db.Column(db.String(100))
+    quantity = db.Column(db.Integer, nullable=False)
+    price = db.Column(db.Float, nullable=False)
+    selected_size = db.Column(db.String(50))
+    selected_color = db.Column(db.String(50))
+    customization = db.Column(db.Text)
+
 # Utility Functions
 def allowed_file(filename):
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
@@ -186,20 +408,964 @@ def save_image(file, folder='products'):
         return f"/uploads/{folder}/{unique_filename}"
     return None
 
+def iso_or_none(value):
+    return value.isoformat() if value else None
+
+# Sparse fieldsets
+# Each entry maps a response field to the model columns it needs and how to render it,
+# so ?fields= / ?view= only load and serialize what the client asked for.
+# Product fields live in serializers.py and are read as column tuples (see product_rows_query).
+ORDER_FIELDS = {
+    'id': (('id',), lambda o: o.id),
+    'orderNumber': (('order_number',), lambda o: o.order_number),
+    'status': (('status',), lambda o: o.status),
+    'paymentStatus': (('payment_status',), lambda o: o.payment_status),
+    'paymentMethod': (('payment_method',), lambda o: o.payment_method),
+    'total': (('total',), lambda o: o.total),
+    'trackingNumber': (('tracking_number',), lambda o: o.tracking_number),
+    'itemCount': ((), lambda o: len(o.items)),
+    'customerName': (('user_id',), lambda o: o.customer_name),
+    'customerEmail': (('user_id',), lambda o: o.customer_email),
+    'createdAt': (('created_at',), lambda o: o.created_at.isoformat()),
+    'updatedAt': (('updated_at',), lambda o: iso_or_none(o.updated_at)),
+    'archived': ((), lambda o: isinstance(o, ArchivedOrder)),
+    'items': ((), lambda o: [{
+        'productName': item.product_name,
+        'quantity': item.quantity,
+        'price': item.price,
+        'selectedSize': item.selected_size,
+        'selectedColor': item.selected_color
+    } for item in o.items]),
+}
+
+ORDER_VIEWS = {
+    'list': ('id', 'orderNumber', 'status', 'paymentStatus', 'total', 'itemCount',
+             'customerName', 'customerEmail', 'createdAt'),
+    'detail': ('id', 'orderNumber', 'status', 'paymentStatus', 'total', 'itemCount',
+               'customerName', 'customerEmail', 'createdAt', 'items'),
+}
+
+def requested_fields(field_specs, views, default_view):
+    # ?fields=a,b,c wins over ?view=name; raises ValueError on unknown names
+    fields = request.args.get('fields')
+    if fields:
+        names = [name.strip() for name in fields.split(',') if name.strip()]
+        unknown = [name for name in names if name not in field_specs]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        if 'id' not in names:
+            names.insert(0, 'id')
+        return tuple(dict.fromkeys(names))
+
+    view = request.args.get('view', default_view)
+    if view not in views:
+        raise ValueError(f"Unknown view: {view}")
+    return views[view]
+
+def load_only_columns(model, field_specs, fields):
+    columns = {'id'}
+    for name in fields:
+        columns.update(field_specs[name][0])
+    return db.load_only(*[getattr(model, column) for column in sorted(columns)])
+
+def serialize_fields(obj, field_specs, fields):
+    return {name: field_specs[name][1](obj) for name in fields}
+
+def product_rows_query(serializer, *extra_columns):
+    # Selects just the serializer's columns as plain rows, no ORM instances or identity map
+    columns = [Category.name.label('category_name') if name == 'category_name' else getattr(Product, name)
+               for name in serializer.columns]
+    query = db.session.query(*columns, *extra_columns).select_from(Product)
+    if serializer.needs_category:
+        query = query.join(Category, Product.category_id == Category.id)
+    return query
+
+def order_query_options(fields):
+    options = [load_only_columns(Order, ORDER_FIELDS, fields)]
+    if 'customerName' in fields or 'customerEmail' in fields:
+        options.append(db.joinedload(Order.user).load_only(User.first_name, User.last_name, User.email))
+    if 'items' in fields:
+        options.append(db.selectinload(Order.items).joinedload(OrderItem.product).load_only(Product.name))
+    elif 'itemCount' in fields:
+        options.append(db.selectinload(Order.items).load_only(OrderItem.id))
+    return options
+
+def archived_order_query_options(fields):
+    if 'items' in fields or 'itemCount' in fields:
+        return [db.selectinload(ArchivedOrder.items)]
+    return []
+
+# Response Compression
+_compressed_cache = OrderedDict()
+_compressed_cache_lock = threading.Lock()
+
+def negotiate_encoding():
+    accepted = request.accept_encodings
+    if brotli is not None and accepted.quality('br') > 0:
+        return 'br'
+    if accepted.quality('gzip') > 0:
+        return 'gzip'
+    return None
+
+def compress_body(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=app.config['COMPRESS_BROTLI_QUALITY'])
+    return gzip.compress(body, compresslevel=app.config['COMPRESS_GZIP_LEVEL'], mtime=0)
+
+def cached_compress(body, encoding):
+    key = (encoding, hashlib.sha1(body).digest())
+    with _compressed_cache_lock:
+        compressed = _compressed_cache.get(key)
+        if compressed is not None:
+            _compressed_cache.move_to_end(key)
+            return compressed
+
+    compressed = compress_body(body, encoding)
+
+    with _compressed_cache_lock:
+        _compressed_cache[key] = compressed
+        while len(_compressed_cache) > app.config['COMPRESS_CACHE_SIZE']:
+            _compressed_cache.popitem(last=False)
+    return compressed
+
+@app.after_request
+def compress_response(response):
+    if (response.direct_passthrough or response.is_streamed
+            or response.status_code < 200 or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in app.config['COMPRESS_MIMETYPES']):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate_encoding()
+    if not encoding:
+        return response
+
+    body = response.get_data()
+    if len(body) < app.config['COMPRESS_MIN_SIZE']:
+        return response
+
+    # Only anonymous GETs are cached, per-user payloads are compressed on the fly
+    if request.method == 'GET' and response.status_code == 200 and 'Authorization' not in request.headers:
+        compressed = cached_compress(body, encoding)
+    else:
+        compressed = compress_body(body, encoding)
+
+    if len(compressed) >= len(body):
+        return response
+
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+# Background Jobs
+# Follow-up work is written to the job table inside the caller's transaction (outbox)
+# and executed later by `flask jobs worker`, so request latency never includes it.
+JOB_HANDLERS = {}
+
+def job_handler(name):
+    def decorator(func):
+        JOB_HANDLERS[name] = func
+        return func
+    return decorator
+
+def enqueue_job(name, payload=None, delay=0, max_attempts=None):
+    # Does not commit: the job becomes visible together with the caller's changes
+    if name not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job: {name}")
+    job = Job(
+        name=name,
+        payload=json.dumps(payload or {}),
+        max_attempts=max_attempts or app.config['JOB_MAX_ATTEMPTS'],
+        run_at=datetime.utcnow() + timedelta(seconds=delay)
+    )
+    db.session.add(job)
+    return job
+
+def claimable_jobs_filter(now):
+    stale = now - timedelta(seconds=app.config['JOB_LOCK_TIMEOUT'])
+    return db.or_(
+        db.and_(Job.status == 'pending', Job.run_at <= now),
+        db.and_(Job.status == 'running', Job.locked_at < stale)
+    )
+
+def claim_job(worker_id):
+    now = datetime.utcnow()
+    candidates = db.session.query(Job.id).filter(claimable_jobs_filter(now)).order_by(Job.run_at).limit(10).all()
+    db.session.rollback()
+
+    for (job_id,) in candidates:
+        # Conditional UPDATE so only one worker wins each job
+        claimed = Job.query.filter(Job.id == job_id, claimable_jobs_filter(now)).update({
+            'status': 'running',
+            'locked_by': worker_id,
+            'locked_at': now,
+            'attempts': Job.attempts + 1,
+            'updated_at': now
+        }, synchronize_session=False)
+        db.session.commit()
+        if claimed:
+            return db.session.get(Job, job_id)
+    return None
+
+def retry_delay(attempts):
+    delay = min(app.config['JOB_RETRY_BASE_DELAY'] * 2 ** (attempts - 1), app.config['JOB_RETRY_MAX_DELAY'])
+    return delay * random.uniform(0.8, 1.2)
+
+def process_job(job):
+    job_id, name, attempts, max_attempts = job.id, job.name, job.attempts, job.max_attempts
+    try:
+        handler = JOB_HANDLERS.get(name)
+        if handler is None:
+            raise LookupError(f"No handler registered for job {name}")
+        handler(**json.loads(job.payload or '{}'))
+        db.session.commit()
+        status, error, run_at = 'done', None, None
+    except Exception as e:
+        db.session.rollback()
+        app.logger.warning('Job %s (%s) failed on attempt %s: %s', job_id, name, attempts, e)
+        error = f"{type(e).__name__}: {e}"
+        if attempts >= max_attempts:
+            status, run_at = 'dead', None
+        else:
+            status, run_at = 'pending', datetime.utcnow() + timedelta(seconds=retry_delay(attempts))
+
+    values = {'status': status, 'last_error': error, 'locked_by': None, 'locked_at': None, 'updated_at': datetime.utcnow()}
+    if run_at:
+        values['run_at'] = run_at
+    Job.query.filter_by(id=job_id).update(values, synchronize_session=False)
+    db.session.commit()
+    return status
+
+def work_loop(worker_id, stop_event, burst=False):
+    with app.app_context():
+        while not stop_event.is_set():
+            job = claim_job(worker_id)
+            if job is None:
+                if burst:
+                    return
+                stop_event.wait(app.config['JOB_POLL_INTERVAL'])
+                continue
+            process_job(job)
+
+def process_work_loop(worker_id, stop_event, burst):
+    # Connections inherited from the parent process must not be reused after fork
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    with app.app_context():
+        db.engine.dispose(close=False)
+    work_loop(worker_id, stop_event, burst)
+
+def run_workers(concurrency=1, model='thread', burst=False):
+    prefix = f"{socket.gethostname()}:{os.getpid()}"
+    if model == 'process':
+        stop_event = multiprocessing.Event()
+        workers = [multiprocessing.Process(target=process_work_loop, args=(f"{prefix}:p{i}", stop_event, burst))
+                   for i in range(concurrency)]
+    else:
+        stop_event = threading.Event()
+        workers = [threading.Thread(target=work_loop, args=(f"{prefix}:t{i}", stop_event, burst), daemon=True)
+                   for i in range(concurrency)]
+
+    for worker in workers:
+        worker.start()
+    try:
+        while any(worker.is_alive() for worker in workers):
+            for worker in workers:
+                worker.join(timeout=0.5)
+    except KeyboardInterrupt:
+        stop_event.set()
+        for worker in workers:
+            worker.join()
+
+@job_handler('send_order_confirmation')
+def send_order_confirmation(order_id):
+    order = db.session.get(Order, order_id)
+    if order is None:
+        return
+    # No mail transport is configured yet, so the confirmation is only logged
+    app.logger.info('Order confirmation for %s to %s (total %.2f)', order.order_number, order.user.email, order.total)
+
+@job_handler('send_order_status_update')
+def send_order_status_update(order_id, status):
+    order = db.session.get(Order, order_id)
+    if order is None:
+        return
+    app.logger.info('Order %s is now %s, notifying %s', order.order_number, status, order.user.email)
+
+@job_handler('check_low_stock')
+def check_low_stock(product_ids):
+    low_stock = Product.query.filter(
+        Product.id.in_(product_ids),
+        Product.pre_order == False,
+        Product.stock_quantity <= app.config['LOW_STOCK_THRESHOLD']
+    ).all()
+    for product in low_stock:
+        app.logger.warning('Low stock: %s has %s left', product.name, product.stock_quantity)
+
+# Change Feed
+# Events are written in the same transaction as the change they describe. A single
+# poller per process reads new rows and fans them out to every open SSE stream, so
+# idle connections never touch the database.
+def record_change(topic, type, data, product_id=None, user_id=None):
+    db.session.add(ChangeEvent(topic=topic, type=type, data=json.dumps(data),
+                               product_id=product_id, user_id=user_id))
+    db.session.info['change_feed_dirty'] = True
+
+def record_product_changes(product, old_price=None, old_stock=None):
+    stock = (product.stock_quantity, product.in_stock)
+    if old_stock is not None and stock != old_stock:
+        record_change('stock', 'stock.changed', {
+            'productId': product.id,
+            'stockQuantity': product.stock_quantity,
+            'inStock': product.in_stock
+        }, product_id=product.id)
+    if old_price is not None and (product.price, product.original_price) != old_price:
+        record_change('price', 'price.changed', {
+            'productId': product.id,
+            'price': product.price,
+            'originalPrice': product.original_price
+        }, product_id=product.id)
+
+class ChangeFeed:
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._wakeup = threading.Event()
+        # Parallel lists in sequence order; sequence numbers only grow, so readers bisect _seqs
+        self._events = []
+        self._seqs = []
+        self._floor = None  # newest sequence number no longer (or never) held in _events
+        self._last_seq = None
+        self._poller = None
+
+    @property
+    def last_seq(self):
+        self.start()
+        return self._last_seq
+
+    def start(self):
+        with self._condition:
+            if self._poller is not None:
+                return
+            with app.app_context():
+                self._last_seq = db.session.query(db.func.max(ChangeEvent.id)).scalar() or 0
+                self._floor = self._last_seq
+            self._poller = threading.Thread(target=self._poll, name='change-feed', daemon=True)
+            self._poller.start()
+
+    def wake(self):
+        self._wakeup.set()
+
+    def _poll(self):
+        with app.app_context():
+            while True:
+                self._wakeup.wait(app.config['CHANGE_FEED_POLL_INTERVAL'])
+                self._wakeup.clear()
+                try:
+                    rows = ChangeEvent.query.filter(ChangeEvent.id > self._last_seq).order_by(ChangeEvent.id).limit(500).all()
+                    events = [event_tuple(row) for row in rows]
+                    db.session.rollback()
+                except Exception as e:
+                    db.session.rollback()
+                    app.logger.warning('Change feed poll failed: %s', e)
+                    continue
+                if not events:
+                    continue
+                with self._condition:
+                    self._events.extend(events)
+                    self._seqs.extend(event[0] for event in events)
+                    excess = len(self._events) - app.config['CHANGE_FEED_BUFFER_SIZE']
+                    if excess > 0:
+                        self._floor = self._seqs[excess - 1]
+                        del self._events[:excess], self._seqs[:excess]
+                    self._last_seq = events[-1][0]
+                    self._condition.notify_all()
+                if len(events) == 500:
+                    self._wakeup.set()
+
+    def wait_for(self, after_seq, timeout):
+        # Returns (events, missed); missed means the buffer no longer reaches after_seq.
+        # Only the slice copy happens under the lock, callers filter per client outside it.
+        with self._condition:
+            self._condition.wait_for(lambda: self._last_seq > after_seq, timeout)
+            if self._last_seq <= after_seq:
+                return [], False
+            if after_seq < self._floor:
+                return self._events[-1:], True
+            return self._events[bisect_right(self._seqs, after_seq):], False
+
+change_feed = ChangeFeed()
+
+@event.listens_for(Session, 'after_commit')
+def wake_change_feed(session):
+    if session.info.pop('change_feed_dirty', False):
+        change_feed.wake()
+
+@event.listens_for(Session, 'after_rollback')
+def clear_change_feed_flag(session):
+    session.info.pop('change_feed_dirty', None)
+
+def event_tuple(row):
+    return (row.id, row.topic, row.type, row.product_id, row.user_id, row.data)
+
+def format_sse(event):
+    seq, topic, type, product_id, user_id, data = event
+    return f"id: {seq}\nevent: {type}\ndata: {data}\n\n"
+
+# Wishlist Membership Cache
+class WishlistCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # user_id -> (expires_at, product ids)
+
+    def get(self, user_id):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(user_id)
+                return entry[1]
+
+        product_ids = frozenset(
+            product_id for (product_id,) in
+            db.session.query(WishlistItem.product_id).filter_by(user_id=user_id)
+        )
+        with self._lock:
+            self._entries[user_id] = (now + app.config['WISHLIST_CACHE_TTL'], product_ids)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > app.config['WISHLIST_CACHE_SIZE']:
+                self._entries.popitem(last=False)
+        return product_ids
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+wishlist_cache = WishlistCache()
+
+def add_wishlist_items(user_id, product_ids):
+    # INSERT .. ON CONFLICT DO NOTHING on (user_id, product_id) so concurrent adds cannot duplicate
+    if not product_ids:
+        return 0
+    stmt = sqlite_insert(WishlistItem.__table__).on_conflict_do_nothing(index_elements=['user_id', 'product_id'])
+    now = datetime.utcnow()
+    result = db.session.connection().execute(stmt, [
+        {'id': str(uuid.uuid4()), 'user_id': user_id, 'product_id': product_id, 'created_at': now}
+        for product_id in product_ids
+    ])
+    return max(result.rowcount, 0)
+
+def ensure_wishlist_unique_index():
+    # Tables created before the unique index existed may hold duplicates from the old check-then-insert
+    db.session.execute(db.text(
+        'DELETE FROM wishlist_item WHERE rowid NOT IN '
+        '(SELECT MIN(rowid) FROM wishlist_item GROUP BY user_id, product_id)'
+    ))
+    db.session.commit()
+    for index in WishlistItem.__table__.indexes:
+        index.create(bind=db.engine, checkfirst=True)
+
+# Order Archiving
+# Delivered/cancelled orders that have not changed for ORDER_ARCHIVE_AFTER_DAYS move to the
+# archive database in small batches. Each batch is copied first (INSERT OR REPLACE, so a
+# rerun after a crash is harmless) and then deleted from the live tables in a short transaction.
+def archive_order_rows(orders):
+    now = datetime.utcnow()
+    order_rows, item_rows = [], []
+    for order in orders:
+        order_rows.append({
+            'id': order.id, 'user_id': order.user_id,
+            'customer_name': order.customer_name, 'customer_email': order.customer_email,
+            'order_number': order.order_number, 'status': order.status,
+            'payment_status': order.payment_status, 'payment_method': order.payment_method,
+            'subtotal': order.subtotal, 'shipping': order.shipping, 'tax': order.tax,
+            'discount': order.discount, 'total': order.total,
+            'shipping_address': order.shipping_address, 'billing_address': order.billing_address,
+            'tracking_number': order.tracking_number, 'notes': order.notes,
+            'created_at': order.created_at, 'updated_at': order.updated_at, 'archived_at': now
+        })
+        for item in order.items:
+            item_rows.append({
+                'id': item.id, 'order_id': order.id, 'product_id': item.product_id,
+                'product_name': item.product.name if item.product else None,
+                'quantity': item.quantity, 'price': item.price,
+                'selected_size': item.selected_size, 'selected_color': item.selected_color,
+                'customization': item.customization
+            })
+    return order_rows, item_rows
+
+def archive_orders(older_than_days=None, batch_size=None, max_batches=None, dry_run=False):
+    days = app.config['ORDER_ARCHIVE_AFTER_DAYS'] if older_than_days is None else older_than_days
+    batch_size = batch_size or app.config['ORDER_ARCHIVE_BATCH_SIZE']
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    statuses = app.config['ORDER_ARCHIVE_STATUSES']
+    eligible = db.and_(Order.status.in_(statuses), Order.updated_at < cutoff)
+
+    if dry_run:
+        return Order.query.filter(eligible).count()
+
+    archived = batches = 0
+    while max_batches is None or batches < max_batches:
+        orders = Order.query.options(
+            db.joinedload(Order.user),
+            db.selectinload(Order.items).joinedload(OrderItem.product)
+        ).filter(eligible).order_by(Order.updated_at).limit(batch_size).all()
+        if not orders:
+            break
+
+        order_rows, item_rows = archive_order_rows(orders)
+        db.session.rollback()  # end the read transaction before writing
+
+        with db.engines['archive'].begin() as conn:
+            conn.execute(ArchivedOrder.__table__.insert().prefix_with('OR REPLACE'), order_rows)
+            if item_rows:
+                conn.execute(ArchivedOrderItem.__table__.insert().prefix_with('OR REPLACE'), item_rows)
+
+        # Only delete rows that are still eligible, in case one changed since it was read
+        order_ids = [row['id'] for row in order_rows]
+        still_eligible = [order_id for (order_id,) in
+                          db.session.query(Order.id).filter(Order.id.in_(order_ids), eligible)]
+        OrderItem.query.filter(OrderItem.order_id.in_(still_eligible)).delete(synchronize_session=False)
+        Order.query.filter(Order.id.in_(still_eligible)).delete(synchronize_session=False)
+        db.session.commit()
+
+        changed = set(order_ids) - set(still_eligible)
+        if changed:
+            with db.engines['archive'].begin() as conn:
+                conn.execute(ArchivedOrderItem.__table__.delete().where(ArchivedOrderItem.order_id.in_(changed)))
+                conn.execute(ArchivedOrder.__table__.delete().where(ArchivedOrder.id.in_(changed)))
+
+        archived += len(still_eligible)
+        batches += 1
+        time.sleep(app.config['ORDER_ARCHIVE_BATCH_PAUSE'])
+    return archived
+
+# Bulk Order Updates
+ORDER_STATUS_TRANSITIONS = {
+    'pending': {'confirmed', 'processing', 'shipped', 'cancelled'},
+    'confirmed': {'processing', 'shipped', 'cancelled'},
+    'processing': {'shipped', 'cancelled'},
+    'shipped': {'delivered'},
+    'delivered': set(),
+    'cancelled': set(),
+}
+PAYMENT_STATUSES = {'pending', 'paid', 'failed', 'refunded'}
+
+BULK_ORDER_COLUMNS = {
+    'orderid': 'orderId', 'id': 'orderId',
+    'ordernumber': 'orderNumber', 'order': 'orderNumber',
+    'status': 'status',
+    'paymentstatus': 'paymentStatus',
+    'trackingnumber': 'trackingNumber', 'tracking': 'trackingNumber',
+    'notes': 'notes',
+}
+
+def parse_bulk_order_csv(file, defaults):
+    # Raises ValueError when the upload is not a UTF-8 CSV
+    try:
+        reader = csv.DictReader(io.StringIO(file.read().decode('utf-8-sig')))
+        rows = []
+        for record in reader:
+            row = dict(defaults)
+            for key, value in record.items():
+                column = BULK_ORDER_COLUMNS.get((key or '').strip().lower().replace('_', '').replace(' ', ''))
+                if column and isinstance(value, str) and value:
+                    row[column] = value.strip()
+            rows.append(row)
+        return rows
+    except UnicodeDecodeError:
+        raise ValueError('File is not UTF-8 encoded; export the CSV as UTF-8 and try again')
+    except csv.Error as e:
+        raise ValueError(f"File is not a valid CSV: {e}")
+
+def bulk_order_row_error(row):
+    # JSON rows can carry any type; every recognised column must be a string or null
+    for field in dict.fromkeys(BULK_ORDER_COLUMNS.values()):
+        if row.get(field) is not None and not isinstance(row[field], str):
+            return f"{field} must be a string"
+    return None
+
+def validate_bulk_order_updates(rows):
+    # One SELECT for every referenced order, then all checks happen in memory
+    errors = [bulk_order_row_error(row) for row in rows]
+    ids = {row['orderId'] for row, error in zip(rows, errors) if row.get('orderId') and not error}
+    numbers = {row['orderNumber'] for row, error in zip(rows, errors)
+               if row.get('orderNumber') and not row.get('orderId') and not error}
+    current = db.session.query(
+        Order.id, Order.order_number, Order.status, Order.payment_status, Order.user_id
+    ).filter(db.or_(Order.id.in_(ids), Order.order_number.in_(numbers))).all() if ids or numbers else []
+    by_id = {order.id: order for order in current}
+    by_number = {order.order_number: order for order in current}
+
+    results, valid, seen = [], [], set()
+    for index, (row, error) in enumerate(zip(rows, errors)):
+        result = {'row': index, 'orderId': row.get('orderId'), 'orderNumber': row.get('orderNumber')}
+        results.append(result)
+        if error:
+            result['error'] = error
+            continue
+
+        order = by_id.get(row.get('orderId')) or by_number.get(row.get('orderNumber'))
+        if order is None:
+            result['error'] = 'Order not found'
+            continue
+        result['orderId'], result['orderNumber'] = order.id, order.order_number
+
+        status = row.get('status') or order.status
+        payment_status = row.get('paymentStatus') or order.payment_status
+        if order.id in seen:
+            result['error'] = 'Order appears more than once in this batch'
+        elif status not in ORDER_STATUS_TRANSITIONS:
+            result['error'] = f"Unknown status: {status}"
+        elif status != order.status and status not in ORDER_STATUS_TRANSITIONS.get(order.status, set()):
+            result['error'] = f"Cannot change status from {order.status} to {status}"
+        elif payment_status not in PAYMENT_STATUSES:
+            result['error'] = f"Unknown payment status: {payment_status}"
+        else:
+            seen.add(order.id)
+            result['status'], result['paymentStatus'] = status, payment_status
+            valid.append((order, status, payment_status, row))
+    return results, valid
+
+def apply_bulk_order_updates(valid):
+    now = datetime.utcnow()
+    orders = Order.__table__
+
+    # Orders moving to the same (status, payment status) share one UPDATE .. WHERE id IN (..)
+    groups = defaultdict(list)
+    for order, status, payment_status, row in valid:
+        groups[(status, payment_status)].append(order.id)
+    for (status, payment_status), order_ids in groups.items():
+        db.session.execute(orders.update().where(orders.c.id.in_(order_ids)).values(
+            status=status, payment_status=payment_status, updated_at=now
+        ))
+
+    # Per-order values go out as a single executemany
+    for column, key in (('tracking_number', 'trackingNumber'), ('notes', 'notes')):
+        params = [{'b_id': order.id, 'b_value': row[key]} for order, status, payment_status, row in valid if key in row]
+        if params:
+            db.session.execute(orders.update().where(orders.c.id == db.bindparam('b_id')).values(
+                {column: db.bindparam('b_value')}
+            ), params)
+
+    for order, status, payment_status, row in valid:
+        record_change('order', 'order.updated', {
+            'orderId': order.id,
+            'orderNumber': order.order_number,
+            'status': status,
+            'paymentStatus': payment_status,
+            'trackingNumber': row.get('trackingNumber')
+        }, user_id=order.user_id)
+        if status != order.status:
+            enqueue_job('send_order_status_update', {'order_id': order.id, 'status': status})
+
+# Login Protection
+# Password hashing is deliberately slow, so it runs on a small bounded pool: a login flood
+# queues (and then fails fast) there instead of occupying every web worker.
+class PasswordHasherBusy(Exception):
+    pass
+
+class PasswordHasher:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._slots = None
+
+    def _start(self):
+        with self._lock:
+            if self._executor is None:
+                workers = app.config['PASSWORD_HASH_WORKERS']
+                self._slots = threading.BoundedSemaphore(workers + app.config['PASSWORD_HASH_MAX_PENDING'])
+                self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+
+    def run(self, func, *args):
+        if self._executor is None:
+            self._start()
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHasherBusy()
+        try:
+            future = self._executor.submit(func, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda f: self._slots.release())
+        try:
+            return future.result(timeout=app.config['PASSWORD_HASH_TIMEOUT'])
+        except FutureTimeoutError:
+            # Drop it if it has not started yet so an abandoned request does not hold a slot
+            future.cancel()
+            raise PasswordHasherBusy()
+
+    def hash(self, password):
+        return self.run(generate_password_hash, password, app.config['PASSWORD_HASH_METHOD'])
+
+    def check(self, password_hash, password):
+        return self.run(check_password_hash, password_hash, password)
+
+password_hasher = PasswordHasher()
+
+def needs_rehash(password_hash):
+    return password_hash.split('$', 1)[0] != app.config['PASSWORD_HASH_METHOD']
+
+class RateLimiter:
+    # Token buckets keyed by e.g. ("login-ip", addr). Buckets idle long enough to be full again
+    # carry no information and are dropped, and the total is capped at RATE_LIMIT_MAX_KEYS.
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()  # key -> (tokens, updated_at, seconds to refill)
+
+    def consume(self, key, limit):
+        capacity, period = limit
+        rate = capacity / period
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at, _ = self._buckets.pop(key, (capacity, now, period))
+            tokens = min(capacity, tokens + (now - updated_at) * rate)
+            if tokens >= 1:
+                tokens -= 1
+                retry_after = 0
+            else:
+                retry_after = (1 - tokens) / rate
+            self._buckets[key] = (tokens, now, period)
+            self._evict(now)
+        return retry_after
+
+    def _evict(self, now):
+        while self._buckets:
+            oldest_key, (tokens, updated_at, period) = next(iter(self._buckets.items()))
+            if now - updated_at < period and len(self._buckets) <= app.config['RATE_LIMIT_MAX_KEYS']:
+                break
+            self._buckets.popitem(last=False)
+
+rate_limiter = RateLimiter()
+
+def rate_limited(retry_after):
+    response = jsonify({'error': 'Too many attempts, please try again later'})
+    response.headers['Retry-After'] = str(max(1, int(retry_after + 0.999)))
+    return response, 429
+
+def hasher_busy():
+    response = jsonify({'error': 'Server busy, please try again'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+# Catalog Single-Flight Cache
+# Concurrent requests for the same catalog key wait on one computation and share its
+# result. Expired entries keep being served for CATALOG_CACHE_STALE_TTL while a single
+# background refresh runs. With CATALOG_CACHE_SHARED_DIR set, the computation is also
+# serialized across worker processes with a fixed set of lock files and the result shared
+# through the directory, which is pruned to CATALOG_CACHE_MAX_ENTRIES by the requests that
+# write to it.
+CATALOG_CACHE_LOCK_FILES = 64
+
+class Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+        self.invalidated = False  # set when a write lands while it runs; the result is then not stored
+
+class SingleFlightCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # (path, query) -> (value, fresh_until, stale_until)
+        self._flights = {}
+        self._shared_writes = 0
+
+    def get(self, key, compute):
+        if not app.config['CATALOG_CACHE_ENABLED']:
+            return compute()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now < entry[1]:
+                self._entries.move_to_end(key)
+                return entry[0]
+            flight = self._flights.get(key)
+            if entry is not None and now < entry[2]:
+                # Stale: answer immediately and let one background thread refresh
+                if flight is None:
+                    flight = self._flights[key] = Flight()
+                    threading.Thread(target=self._refresh, args=(key, compute, flight), daemon=True).start()
+                return entry[0]
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = Flight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+        return self._run(key, compute, flight)
+
+    def _refresh(self, key, compute, flight):
+        with app.app_context():
+            g.db_read_only = True
+            try:
+                self._run(key, compute, flight)
+            except Exception as e:
+                app.logger.warning('Catalog cache refresh for %s failed: %s', key, e)
+
+    def _run(self, key, compute, flight):
+        try:
+            flight.value = self._compute(key, compute)
+        except Exception as e:
+            flight.error = e
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            # Results computed before an invalidation go to the requests already waiting but are not stored
+            if flight.error is None and not flight.invalidated:
+                now = time.monotonic()
+                ttl = app.config['CATALOG_CACHE_TTL']
+                self._entries[key] = (flight.value, now + ttl, now + ttl + app.config['CATALOG_CACHE_STALE_TTL'])
+                self._entries.move_to_end(key)
+                while len(self._entries) > app.config['CATALOG_CACHE_MAX_ENTRIES']:
+                    self._entries.popitem(last=False)
+        flight.done.set()
+        if flight.error is not None:
+            raise flight.error
+        return flight.value
+
+    # Shared directory layout: one file per key named by its sha1, holding the generation it
+    # was computed in and the body; a 'generation' file that invalidate() replaces; and
+    # CATALOG_CACHE_LOCK_FILES lock files that keys are spread over.
+    @staticmethod
+    def _shared_path(shared_dir, key):
+        return os.path.join(shared_dir, hashlib.sha1(f"{key[0]}?{key[1]}".encode()).hexdigest())
+
+    @staticmethod
+    def _shared_generation(shared_dir):
+        try:
+            with open(os.path.join(shared_dir, 'generation'), encoding='utf-8') as f:
+                return f.read()
+        except FileNotFoundError:
+            return ''
+
+    def _compute(self, key, compute):
+        shared_dir = app.config['CATALOG_CACHE_SHARED_DIR']
+        if not shared_dir or fcntl is None:
+            return compute()
+
+        os.makedirs(shared_dir, exist_ok=True)
+        path = self._shared_path(shared_dir, key)
+        lock_path = os.path.join(shared_dir, f"lock-{int(os.path.basename(path)[:8], 16) % CATALOG_CACHE_LOCK_FILES}")
+        with open(lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                generation = self._shared_generation(shared_dir)
+                # Another process may have computed it while we waited for the lock
+                try:
+                    if time.time() - os.path.getmtime(path) < app.config['CATALOG_CACHE_TTL']:
+                        with open(path, encoding='utf-8') as f:
+                            stored_generation, value = f.read().split('\n', 1)
+                        if stored_generation == generation:
+                            return value
+                except (FileNotFoundError, ValueError):
+                    pass
+                value = compute()
+                with open(path + '.tmp', 'w', encoding='utf-8') as f:
+                    f.write(f"{generation}\n{value}")
+                os.replace(path + '.tmp', path)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+        with self._lock:
+            self._shared_writes += 1
+            prune = self._shared_writes % max(1, app.config['CATALOG_CACHE_MAX_ENTRIES'] // 10) == 0
+        if prune:
+            self._prune_shared(shared_dir)
+        return value
+
+    def _prune_shared(self, shared_dir):
+        # Files past CATALOG_CACHE_TTL are never served again; beyond that keep the newest entries
+        now = time.time()
+        live = []
+        for entry in os.scandir(shared_dir):
+            if len(entry.name) != 40 or '.' in entry.name or '-' in entry.name:
+                continue  # lock, generation and temporary files
+            try:
+                mtime = entry.stat().st_mtime
+                if now - mtime >= app.config['CATALOG_CACHE_TTL']:
+                    os.remove(entry.path)
+                else:
+                    live.append((mtime, entry.path))
+            except FileNotFoundError:
+                pass
+        live.sort()
+        for _, path in live[:max(0, len(live) - app.config['CATALOG_CACHE_MAX_ENTRIES'])]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def invalidate(self):
+        # Shared results are invalidated too; other processes' local entries expire within CATALOG_CACHE_TTL
+        with self._lock:
+            self._entries.clear()
+            for flight in self._flights.values():
+                flight.invalidated = True
+            self._flights.clear()  # later requests must not join a computation started before the write
+        shared_dir = app.config['CATALOG_CACHE_SHARED_DIR']
+        if shared_dir and os.path.isdir(shared_dir):
+            # A new generation rather than deleting files keeps this O(1) for the writer
+            tmp_path = os.path.join(shared_dir, f"generation.{uuid.uuid4().hex}.tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(uuid.uuid4().hex)
+            os.replace(tmp_path, os.path.join(shared_dir, 'generation'))
+
+    def invalidate_paths(self, paths):
+        # Drops every cached variant of the given paths, e.g. the detail pages of ordered products
+        paths = set(paths)
+        with self._lock:
+            keys = {key for key in self._entries if key[0] in paths}
+            keys.update(key for key in self._flights if key[0] in paths)
+            keys.update((path, '') for path in paths)
+            for key in keys:
+                self._entries.pop(key, None)
+                flight = self._flights.pop(key, None)
+                if flight is not None:
+                    flight.invalidated = True
+        shared_dir = app.config['CATALOG_CACHE_SHARED_DIR']
+        if shared_dir:
+            for key in keys:
+                try:
+                    os.remove(self._shared_path(shared_dir, key))
+                except FileNotFoundError:
+                    pass
+
+catalog_cache = SingleFlightCache()
+
+def catalog_cache_key(params):
+    # Only the parameters the endpoint reads, in a fixed order, so unknown or cache-busting
+    # parameters neither add entries nor bypass coalescing
+    return request.path, urlencode([(name, request.args[name]) for name in params if name in request.args])
+
+def cached_json_response(compute, params):
+    body = catalog_cache.get(catalog_cache_key(params), lambda: app.json.dumps(compute()))
+    return app.response_class(body, mimetype=app.json.mimetype)
+
 # Authentication Routes
 @app.route('/api/auth/register', methods=['POST'])
 def register():
     try:
         data = request.get_json()
         
+        retry_after = rate_limiter.consume(('register-ip', request.remote_addr), app.config['REGISTER_RATE_LIMIT_PER_IP'])
+        if retry_after:
+            return rate_limited(retry_after)
+        
         # Check if user exists
         if User.query.filter_by(email=data['email']).first():
             return jsonify({'error': 'Email already registered'}), 400
+        db.session.rollback()
+        
+        password_hash = password_hasher.hash(data['password'])
         
         # Create new user
         user = User(
             email=data['email'],
-            password_hash=generate_password_hash(data['password']),
+            password_hash=password_hash,
             first_name=data['firstName'],
             last_name=data['lastName'],
             phone=data.get('phone', ''),
@@ -223,6 +1389,8 @@ def register():
             }
         }), 201
         
+    except PasswordHasherBusy:
+        return hasher_busy()
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -230,9 +1398,30 @@ def register():
 def login():
     try:
         data = request.get_json()
+        
+        for key, limit in ((('login-ip', request.remote_addr), app.config['LOGIN_RATE_LIMIT_PER_IP']),
+                           (('login-email', str(data['email']).strip().lower()), app.config['LOGIN_RATE_LIMIT_PER_EMAIL'])):
+            retry_after = rate_limiter.consume(key, limit)
+            if retry_after:
+                return rate_limited(retry_after)
+        
         user = User.query.filter_by(email=data['email']).first()
         
-        if user and check_password_hash(user.password_hash, data['password']):
+        # Return the pooled connection before waiting on the hasher, otherwise a login
+        # flood starves every other route of database connections
+        if user:
+            db.session.expunge(user)
+        db.session.rollback()
+        
+        if user and password_hasher.check(user.password_hash, data['password']):
+            if needs_rehash(user.password_hash):
+                # Best effort: a busy hasher must not fail a login that already succeeded,
+                # the rehash is retried on the next one
+                try:
+                    User.query.filter_by(id=user.id).update({'password_hash': password_hasher.hash(data['password'])})
+                    db.session.commit()
+                except PasswordHasherBusy:
+                    pass
             access_token = create_access_token(identity=user.id)
             return jsonify({
                 'access_token': access_token,
@@ -247,111 +1436,94 @@ def login():
         
         return jsonify({'error': 'Invalid credentials'}), 401
         
+    except PasswordHasherBusy:
+        return hasher_busy()
     except Exception as e:
+        db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 # Product Routes
+PRODUCT_LIST_PARAMS = ('page', 'per_page', 'category', 'search', 'sort_by', 'order', 'fields', 'view')
+
+def build_products_page(args, fields):
+    page = args.get('page', 1, type=int)
+    per_page = args.get('per_page', 12, type=int)
+    category = args.get('category')
+    search = args.get('search')
+    sort_by = args.get('sort_by', 'created_at')
+    order = args.get('order', 'desc')
+    
+    serializer = product_serializer(fields)
+    query = product_rows_query(serializer).filter(Product.is_active == True)
+    
+    # Apply filters
+    if category:
+        cat = Category.query.filter_by(name=category).first()
+        if cat:
+            query = query.filter(Product.category_id == cat.id)
+    
+    if search:
+        query = query.filter(
+            db.or_(
+                Product.name.contains(search),
+                Product.description.contains(search),
+                Product.tags.contains(search)
+            )
+        )
+    
+    # Apply sorting
+    if hasattr(Product, sort_by):
+        if order == 'desc':
+            query = query.order_by(getattr(Product, sort_by).desc())
+        else:
+            query = query.order_by(getattr(Product, sort_by))
+    
+    products = query.paginate(
+        page=page, per_page=per_page, error_out=False
+    )
+    
+    return {
+        'products': serializer.serialize_many(products.items),
+        'pagination': {
+            'page': products.page,
+            'pages': products.pages,
+            'per_page': products.per_page,
+            'total': products.total,
+            'has_next': products.has_next,
+            'has_prev': products.has_prev
+        }
+    }
+
+def build_product(product_id, fields):
+    serializer = product_serializer(fields)
+    row = product_rows_query(serializer).filter(Product.id == product_id).first_or_404()
+    return serializer.serialize(row)
+
 @app.route('/api/products', methods=['GET'])
+@read_only
 def get_products():
     try:
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 12, type=int)
-        category = request.args.get('category')
-        search = request.args.get('search')
-        sort_by = request.args.get('sort_by', 'created_at')
-        order = request.args.get('order', 'desc')
-        
-        query = Product.query.filter_by(is_active=True)
-        
-        # Apply filters
-        if category:
-            cat = Category.query.filter_by(name=category).first()
-            if cat:
-                query = query.filter_by(category_id=cat.id)
-        
-        if search:
-            query = query.filter(
-                db.or_(
-                    Product.name.contains(search),
-                    Product.description.contains(search),
-                    Product.tags.contains(search)
-                )
-            )
+        try:
+            fields = requested_fields(PRODUCT_FIELDS, PRODUCT_VIEWS, 'detail')
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        # Apply sorting
-        if hasattr(Product, sort_by):
-            if order == 'desc':
-                query = query.order_by(getattr(Product, sort_by).desc())
-            else:
-                query = query.order_by(getattr(Product, sort_by))
-        
-        products = query.paginate(
-            page=page, per_page=per_page, error_out=False
-        )
-        
-        return jsonify({
-            'products': [{
-                'id': p.id,
-                'name': p.name,
-                'description': p.description,
-                'price': p.price,
-                'originalPrice': p.original_price,
-                'category': p.category.name,
-                'images': json.loads(p.images) if p.images else [],
-                'inStock': p.in_stock,
-                'stockQuantity': p.stock_quantity,
-                'preOrder': p.pre_order,
-                'estimatedDispatch': p.estimated_dispatch.isoformat() if p.estimated_dispatch else None,
-                'materials': json.loads(p.materials) if p.materials else [],
-                'sizes': json.loads(p.sizes) if p.sizes else [],
-                'colors': json.loads(p.colors) if p.colors else [],
-                'rating': p.rating,
-                'reviewCount': p.review_count,
-                'tags': json.loads(p.tags) if p.tags else [],
-                'isFeatured': p.is_featured,
-                'createdAt': p.created_at.isoformat(),
-                'updatedAt': p.updated_at.isoformat()
-            } for p in products.items],
-            'pagination': {
-                'page': products.page,
-                'pages': products.pages,
-                'per_page': products.per_page,
-                'total': products.total,
-                'has_next': products.has_next,
-                'has_prev': products.has_prev
-            }
-        }), 200
+        args = request.args.copy()
+        return cached_json_response(lambda: build_products_page(args, fields), PRODUCT_LIST_PARAMS), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/products/<product_id>', methods=['GET'])
+@read_only
 def get_product(product_id):
     try:
-        product = Product.query.get_or_404(product_id)
+        try:
+            fields = requested_fields(PRODUCT_FIELDS, PRODUCT_VIEWS, 'detail')
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        return jsonify({
-            'id': product.id,
-            'name': product.name,
-            'description': product.description,
-            'price': product.price,
-            'originalPrice': product.original_price,
-            'category': product.category.name,
-            'images': json.loads(product.images) if product.images else [],
-            'inStock': product.in_stock,
-            'stockQuantity': product.stock_quantity,
-            'preOrder': product.pre_order,
-            'estimatedDispatch': product.estimated_dispatch.isoformat() if product.estimated_dispatch else None,
-            'materials': json.loads(product.materials) if product.materials else [],
-            'sizes': json.loads(product.sizes) if product.sizes else [],
-            'colors': json.loads(product.colors) if product.colors else [],
-            'rating': product.rating,
-            'reviewCount': product.review_count,
-            'tags': json.loads(product.tags) if product.tags else [],
-            'isFeatured': product.is_featured,
-            'createdAt': product.created_at.isoformat(),
-            'updatedAt': product.updated_at.isoformat()
-        }), 200
+        return cached_json_response(lambda: build_product(product_id, fields), ('fields', 'view')), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -403,7 +1575,11 @@ def create_product():
         )
         
         db.session.add(product)
+        db.session.flush()
+        record_change('catalog', 'product.created', {'productId': product.id, 'name': product.name},
+                      product_id=product.id)
         db.session.commit()
+        catalog_cache.invalidate()
         
         return jsonify({'message': 'Product created successfully', 'id': product.id}), 201
         
@@ -423,6 +1599,8 @@ def update_product(product_id):
         
         product = Product.query.get_or_404(product_id)
         data = request.form.to_dict()
+        old_price = (product.price, product.original_price)
+        old_stock = (product.stock_quantity, product.in_stock)
         
         # Handle file uploads
         existing_images = json.loads(product.images) if product.images else []
@@ -462,8 +1640,12 @@ def update_product(product_id):
         
         product.is_featured = data.get('isFeatured', str(product.is_featured)).lower() == 'true'
         product.updated_at = datetime.utcnow()
+        record_product_changes(product, old_price=old_price, old_stock=old_stock)
+        record_change('catalog', 'product.updated', {'productId': product.id, 'name': product.name},
+                      product_id=product.id)
         
         db.session.commit()
+        catalog_cache.invalidate()
         
         return jsonify({'message': 'Product updated successfully'}), 200
         
@@ -483,7 +1665,9 @@ def delete_product(product_id):
         
         product = Product.query.get_or_404(product_id)
         product.is_active = False
+        record_change('catalog', 'product.deleted', {'productId': product.id}, product_id=product.id)
         db.session.commit()
+        catalog_cache.invalidate()
         
         return jsonify({'message': 'Product deleted successfully'}), 200
         
@@ -493,6 +1677,7 @@ def delete_product(product_id):
 
 # Category Routes
 @app.route('/api/categories', methods=['GET'])
+@read_only
 def get_categories():
     try:
         categories = Category.query.filter_by(is_active=True).all()
@@ -550,11 +1735,24 @@ def create_order():
             
             # Update stock
             if not product.pre_order:
+                old_stock = (product.stock_quantity, product.in_stock)
                 product.stock_quantity -= item_data['quantity']
                 if product.stock_quantity <= 0:
                     product.in_stock = False
+                record_product_changes(product, old_stock=old_stock)
         
+        record_change('order', 'order.created', {
+            'orderId': order.id,
+            'orderNumber': order.order_number,
+            'status': order.status,
+            'paymentStatus': order.payment_status,
+            'total': order.total
+        }, user_id=user_id)
+        enqueue_job('send_order_confirmation', {'order_id': order.id})
+        enqueue_job('check_low_stock', {'product_ids': [item['productId'] for item in data['items']]})
         db.session.commit()
+        # Stock changed: drop the ordered products' detail pages, list pages catch up within CATALOG_CACHE_TTL
+        catalog_cache.invalidate_paths(f"/api/products/{item['productId']}" for item in data['items'])
         
         return jsonify({
             'message': 'Order created successfully',
@@ -573,29 +1771,33 @@ def get_orders():
         user_id = get_jwt_identity()
         user = User.query.get(user_id)
         
-        if user.role == 'admin':
-            orders = Order.query.order_by(Order.created_at.desc()).all()
-        else:
-            orders = Order.query.filter_by(user_id=user_id).order_by(Order.created_at.desc()).all()
-        
-        return jsonify([{
-            'id': order.id,
-            'orderNumber': order.order_number,
-            'status': order.status,
-            'paymentStatus': order.payment_status,
-            'total': order.total,
-            'itemCount': len(order.items),
-            'customerName': f"{order.user.first_name} {order.user.last_name}",
-            'customerEmail': order.user.email,
-            'createdAt': order.created_at.isoformat(),
-            'items': [{
-                'productName': item.product.name,
-                'quantity': item.quantity,
-                'price': item.price,
-                'selectedSize': item.selected_size,
-                'selectedColor': item.selected_color
-            } for item in order.items]
-        } for order in orders]), 200
+        try:
+            fields = requested_fields(ORDER_FIELDS, ORDER_VIEWS, 'detail')
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # scope=active reads only the live tables, scope=archived only the archive. Admins
+        # default to active so the operations screen does not grow with the archived history;
+        # customers default to their full history.
+        scope = request.args.get('scope', 'active' if user.role == 'admin' else 'all')
+        if scope not in ('all', 'active', 'archived'):
+            return jsonify({'error': f"Unknown scope: {scope}"}), 400
+        
+        orders = []
+        if scope in ('all', 'active'):
+            query = Order.query.options(*order_query_options(fields))
+            if user.role != 'admin':
+                query = query.filter_by(user_id=user_id)
+            orders += query.order_by(Order.created_at.desc()).all()
+        if scope in ('all', 'archived'):
+            query = ArchivedOrder.query.options(*archived_order_query_options(fields))
+            if user.role != 'admin':
+                query = query.filter_by(user_id=user_id)
+            orders += query.order_by(ArchivedOrder.created_at.desc()).all()
+        if scope == 'all':
+            orders.sort(key=lambda order: order.created_at, reverse=True)
+        
+        return jsonify([serialize_fields(order, ORDER_FIELDS, fields) for order in orders]), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -613,6 +1815,7 @@ def update_order_status(order_id):
         data = request.get_json()
         order = Order.query.get_or_404(order_id)
         
+        status_changed = data['status'] != order.status
         order.status = data['status']
         if 'paymentStatus' in data:
             order.payment_status = data['paymentStatus']
@@ -622,6 +1825,15 @@ def update_order_status(order_id):
             order.notes = data['notes']
         
         order.updated_at = datetime.utcnow()
+        record_change('order', 'order.updated', {
+            'orderId': order.id,
+            'orderNumber': order.order_number,
+            'status': order.status,
+            'paymentStatus': order.payment_status,
+            'trackingNumber': order.tracking_number
+        }, user_id=order.user_id)
+        if status_changed:
+            enqueue_job('send_order_status_update', {'order_id': order.id, 'status': order.status})
         db.session.commit()
         
         return jsonify({'message': 'Order status updated successfully'}), 200
@@ -630,49 +1842,145 @@ def update_order_status(order_id):
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/admin/orders/bulk-status', methods=['POST'])
+@jwt_required()
+def bulk_update_order_status():
+    # Accepts JSON {"orders": [...], "atomic": bool} or a CSV upload in "file" (e.g. a carrier
+    # tracking export); form fields status/paymentStatus fill in columns the CSV lacks
+    try:
+        user_id = get_jwt_identity()
+        user = User.query.get(user_id)
+        
+        if user.role != 'admin':
+            return jsonify({'error': 'Admin access required'}), 403
+        
+        if 'file' in request.files:
+            defaults = {key: request.form[key] for key in ('status', 'paymentStatus') if request.form.get(key)}
+            try:
+                rows = parse_bulk_order_csv(request.files['file'], defaults)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            atomic = request.form.get('atomic', 'false').lower() == 'true'
+        else:
+            data = request.get_json() or {}
+            rows = data.get('orders')
+            atomic = bool(data.get('atomic', False))
+            if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+                return jsonify({'error': 'orders must be a list of objects'}), 400
+        
+        if not rows:
+            return jsonify({'error': 'No orders to update'}), 400
+        if len(rows) > app.config['ORDER_BULK_MAX_ROWS']:
+            return jsonify({'error': f"At most {app.config['ORDER_BULK_MAX_ROWS']} orders per request"}), 400
+        
+        results, valid = validate_bulk_order_updates(rows)
+        failed = len(results) - len(valid)
+        if valid and not (atomic and failed):
+            apply_bulk_order_updates(valid)
+            db.session.commit()
+            updated = len(valid)
+        else:
+            db.session.rollback()
+            updated = 0
+        
+        for result in results:
+            result['updated'] = updated > 0 and 'error' not in result
+        
+        return jsonify({
+            'updated': updated,
+            'failed': failed,
+            'results': results
+        }), 200 if updated or not failed else 422
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 # Wishlist Routes
 @app.route('/api/wishlist', methods=['GET'])
 @jwt_required()
 def get_wishlist():
     try:
         user_id = get_jwt_identity()
-        wishlist_items = WishlistItem.query.filter_by(user_id=user_id).all()
+        serializer = product_serializer(PRODUCT_VIEWS['wishlist'])
+        rows = product_rows_query(serializer, WishlistItem.created_at.label('added_at')).join(
+            WishlistItem, WishlistItem.product_id == Product.id
+        ).filter(WishlistItem.user_id == user_id).all()
         
         products = []
-        for item in wishlist_items:
-            product = item.product
-            products.append({
-                'id': product.id,
-                'name': product.name,
-                'price': product.price,
-                'originalPrice': product.original_price,
-                'images': json.loads(product.images) if product.images else [],
-                'inStock': product.in_stock,
-                'rating': product.rating,
-                'reviewCount': product.review_count,
-                'addedAt': item.created_at.isoformat()
-            })
+        for row in rows:
+            product = serializer.serialize(row)
+            product['addedAt'] = row.added_at
+            products.append(product)
         
         return jsonify(products), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/wishlist/ids', methods=['GET'])
+@jwt_required()
+def get_wishlist_ids():
+    try:
+        user_id = get_jwt_identity()
+        return jsonify({'productIds': sorted(wishlist_cache.get(user_id))}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/wishlist/sync', methods=['POST'])
+@jwt_required()
+def sync_wishlist():
+    # Applies a batch of adds and removes in one transaction; also used to merge a guest wishlist at login
+    try:
+        user_id = get_jwt_identity()
+        data = request.get_json() or {}
+        if not all(isinstance(data.get(key, []), list) and all(isinstance(product_id, str) for product_id in data.get(key, []))
+                   for key in ('add', 'remove')):
+            return jsonify({'error': 'add and remove must be lists of product ids'}), 400
+        
+        add = list(dict.fromkeys(data.get('add', [])))
+        remove = list(dict.fromkeys(data.get('remove', [])))
+        if len(add) + len(remove) > app.config['WISHLIST_SYNC_MAX_ITEMS']:
+            return jsonify({'error': f"At most {app.config['WISHLIST_SYNC_MAX_ITEMS']} changes per request"}), 400
+        
+        remove_set = set(remove)
+        add = [product_id for product_id in add if product_id not in remove_set]
+        known = {product_id for (product_id,) in db.session.query(Product.id).filter(
+            Product.id.in_(add), Product.is_active == True
+        )} if add else set()
+        
+        added = add_wishlist_items(user_id, [product_id for product_id in add if product_id in known])
+        removed = WishlistItem.query.filter(
+            WishlistItem.user_id == user_id,
+            WishlistItem.product_id.in_(remove)
+        ).delete(synchronize_session=False) if remove else 0
+        db.session.commit()
+        wishlist_cache.invalidate(user_id)
+        
+        return jsonify({
+            'added': added,
+            'removed': removed,
+            'unknown': [product_id for product_id in add if product_id not in known],
+            'productIds': sorted(wishlist_cache.get(user_id))
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/wishlist/<product_id>', methods=['POST'])
 @jwt_required()
 def add_to_wishlist(product_id):
     try:
         user_id = get_jwt_identity()
         
-        # Check if already in wishlist
-        existing = WishlistItem.query.filter_by(user_id=user_id, product_id=product_id).first()
-        if existing:
-            return jsonify({'message': 'Product already in wishlist'}), 200
-        
-        wishlist_item = WishlistItem(user_id=user_id, product_id=product_id)
-        db.session.add(wishlist_item)
+        added = add_wishlist_items(user_id, [product_id])
         db.session.commit()
+        wishlist_cache.invalidate(user_id)
         
+        if not added:
+            return jsonify({'message': 'Product already in wishlist'}), 200
         return jsonify({'message': 'Product added to wishlist'}), 201
         
     except Exception as e:
@@ -684,11 +1992,9 @@ def add_to_wishlist(product_id):
 def remove_from_wishlist(product_id):
     try:
         user_id = get_jwt_identity()
-        wishlist_item = WishlistItem.query.filter_by(user_id=user_id, product_id=product_id).first()
-        
-        if wishlist_item:
-            db.session.delete(wishlist_item)
-            db.session.commit()
+        WishlistItem.query.filter_by(user_id=user_id, product_id=product_id).delete(synchronize_session=False)
+        db.session.commit()
+        wishlist_cache.invalidate(user_id)
         
         return jsonify({'message': 'Product removed from wishlist'}), 200
         
@@ -709,15 +2015,21 @@ def get_dashboard_stats():
         
         # Calculate stats
         total_products = Product.query.filter_by(is_active=True).count()
-        total_orders = Order.query.count()
+        total_orders = Order.query.count() + ArchivedOrder.query.count()
         total_customers = User.query.filter_by(role='customer').count()
-        total_revenue = db.session.query(db.func.sum(Order.total)).filter_by(payment_status='paid').scalar() or 0
+        total_revenue = (
+            (db.session.query(db.func.sum(Order.total)).filter_by(payment_status='paid').scalar() or 0) +
+            (db.session.query(db.func.sum(ArchivedOrder.total)).filter_by(payment_status='paid').scalar() or 0)
+        )
         
         # Recent orders
         recent_orders = Order.query.order_by(Order.created_at.desc()).limit(5).all()
         
         # Top products
-        top_products = Product.query.filter_by(is_active=True).order_by(Product.review_count.desc()).limit(5).all()
+        top_products_serializer = product_serializer(PRODUCT_VIEWS['dashboard'])
+        top_products = product_rows_query(top_products_serializer).filter(
+            Product.is_active == True
+        ).order_by(Product.review_count.desc()).limit(5).all()
         
         return jsonify({
             'stats': {
@@ -734,13 +2046,7 @@ def get_dashboard_stats():
                 'status': order.status,
                 'createdAt': order.created_at.isoformat()
             } for order in recent_orders],
-            'topProducts': [{
-                'id': product.id,
-                'name': product.name,
-                'price': product.price,
-                'reviewCount': product.review_count,
-                'images': json.loads(product.images) if product.images else []
-            } for product in top_products]
+            'topProducts': top_products_serializer.serialize_many(top_products)
         }), 200
         
     except Exception as e:
@@ -748,6 +2054,7 @@ def get_dashboard_stats():
 
 # Offers Routes
 @app.route('/api/offers', methods=['GET'])
+@read_only
 def get_offers():
     try:
         current_time = datetime.utcnow()
@@ -802,6 +2109,7 @@ def create_offer():
 
 # Search Route
 @app.route('/api/search', methods=['GET'])
+@read_only
 def search():
     try:
         query = request.args.get('q', '')
@@ -809,7 +2117,8 @@ def search():
             return jsonify({'products': [], 'categories': []}), 200
         
         # Search products
-        products = Product.query.filter(
+        serializer = product_serializer(PRODUCT_VIEWS['search'])
+        products = product_rows_query(serializer).filter(
             Product.is_active == True,
             db.or_(
                 Product.name.contains(query),
@@ -825,13 +2134,7 @@ def search():
         ).limit(5).all()
         
         return jsonify({
-            'products': [{
-                'id': p.id,
-                'name': p.name,
-                'price': p.price,
-                'images': json.loads(p.images) if p.images else [],
-                'category': p.category.name
-            } for p in products],
+            'products': serializer.serialize_many(products),
             'categories': [{
                 'id': c.id,
                 'name': c.name
@@ -841,14 +2144,164 @@ def search():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# Change Feed Routes
+@app.route('/api/events', methods=['GET'])
+def stream_events():
+    try:
+        # EventSource cannot send headers, so the token may also come as ?jwt=
+        verify_jwt_in_request(optional=True, locations=['headers', 'query_string'])
+        user_id = get_jwt_identity()
+        user = db.session.get(User, user_id) if user_id else None
+        is_admin = user is not None and user.role == 'admin'
+
+        product_ids = {pid for pid in request.args.get('products', '').split(',') if pid}
+        if not is_admin and not product_ids:
+            return jsonify({'error': 'products parameter required'}), 400
+
+        def wanted(event):
+            seq, topic, type, product_id, event_user_id, data = event
+            if is_admin:
+                return True
+            return topic in ('stock', 'price') and product_id in product_ids
+
+        last_event_id = request.headers.get('Last-Event-ID', request.args.get('lastEventId'))
+        last_seq = change_feed.last_seq
+        replay, reset = [], False
+        if last_event_id is not None:
+            try:
+                last_seq = int(last_event_id)
+            except ValueError:
+                return jsonify({'error': 'Invalid Last-Event-ID'}), 400
+            limit = app.config['CHANGE_FEED_REPLAY_LIMIT']
+            rows = ChangeEvent.query.filter(ChangeEvent.id > last_seq).order_by(ChangeEvent.id).limit(limit + 1).all()
+            replay = [event_tuple(row) for row in rows]
+            if len(replay) > limit:
+                replay, reset = [], True
+            elif replay:
+                last_seq = replay[-1][0]
+        db.session.remove()
+
+        def generate(last_seq):
+            yield "retry: 3000\n\n"
+            if reset:
+                yield f"id: {change_feed.last_seq}\nevent: reset\ndata: {{}}\n\n"
+                last_seq = change_feed.last_seq
+            for event in replay:
+                if wanted(event):
+                    yield format_sse(event)
+            while True:
+                events, missed = change_feed.wait_for(last_seq, app.config['CHANGE_FEED_HEARTBEAT'])
+                if missed:
+                    # Client fell behind the in-memory buffer; tell it to refetch state
+                    yield f"id: {events[-1][0]}\nevent: reset\ndata: {{}}\n\n"
+                    last_seq = events[-1][0]
+                    continue
+                if not events:
+                    yield ": keep-alive\n\n"
+                    continue
+                for event in events:
+                    if wanted(event):
+                        yield format_sse(event)
+                last_seq = events[-1][0]
+
+        return Response(generate(last_seq), mimetype='text/event-stream', headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        })
+
+    except (JWTExtendedException, PyJWTError) as e:
+        # A malformed or expired ?jwt= is an authentication failure, not a server error
+        return jsonify({'error': str(e)}), 401
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 # Static file serving
 @app.route('/uploads/<path:filename>')
 def uploaded_file(filename):
     return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
 
+# Job queue CLI
+jobs_cli = AppGroup('jobs', help='Run and inspect the background job queue.')
+
+@jobs_cli.command('worker')
+@click.option('--concurrency', '-c', default=1, show_default=True, help='Number of parallel workers.')
+@click.option('--model', type=click.Choice(['thread', 'process']), default='thread', show_default=True,
+              help='Run workers as threads in this process or as separate processes.')
+@click.option('--burst', is_flag=True, help='Exit once the queue is empty.')
+def jobs_worker(concurrency, model, burst):
+    click.echo(f"Starting {concurrency} {model} worker(s)")
+    run_workers(concurrency, model, burst)
+
+@jobs_cli.command('stats')
+def jobs_stats():
+    counts = db.session.query(Job.status, db.func.count(Job.id)).group_by(Job.status).all()
+    for status, count in sorted(counts):
+        click.echo(f"{status:<10}{count}")
+
+@jobs_cli.command('list')
+@click.option('--status', default='dead', show_default=True)
+@click.option('--limit', default=20, show_default=True)
+def jobs_list(status, limit):
+    jobs = Job.query.filter_by(status=status).order_by(Job.updated_at.desc()).limit(limit).all()
+    for job in jobs:
+        click.echo(f"{job.id}  {job.name:<28} attempts={job.attempts}/{job.max_attempts}  "
+                   f"run_at={job.run_at:%Y-%m-%d %H:%M:%S}  {job.last_error or ''}")
+
+@jobs_cli.command('retry')
+@click.argument('job_ids', nargs=-1)
+@click.option('--all-dead', is_flag=True, help='Requeue every dead job.')
+def jobs_retry(job_ids, all_dead):
+    query = Job.query.filter_by(status='dead')
+    if not all_dead:
+        query = query.filter(Job.id.in_(job_ids))
+    count = query.update({'status': 'pending', 'attempts': 0, 'run_at': datetime.utcnow(), 'last_error': None},
+                         synchronize_session=False)
+    db.session.commit()
+    click.echo(f"Requeued {count} job(s)")
+
+@jobs_cli.command('purge')
+@click.option('--older-than-days', default=7, show_default=True)
+def jobs_purge(older_than_days):
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    count = Job.query.filter(Job.status == 'done', Job.updated_at < cutoff).delete(synchronize_session=False)
+    db.session.commit()
+    click.echo(f"Purged {count} finished job(s)")
+
+app.cli.add_command(jobs_cli)
+
+# Change feed CLI
+events_cli = AppGroup('events', help='Manage the change feed table.')
+
+@events_cli.command('prune')
+@click.option('--older-than-hours', default=None, type=int,
+              help='Defaults to CHANGE_FEED_RETENTION_HOURS.')
+def events_prune(older_than_hours):
+    hours = older_than_hours or app.config['CHANGE_FEED_RETENTION_HOURS']
+    cutoff = datetime.utcnow() - timedelta(hours=hours)
+    count = ChangeEvent.query.filter(ChangeEvent.created_at < cutoff).delete(synchronize_session=False)
+    db.session.commit()
+    click.echo(f"Pruned {count} change event(s)")
+
+app.cli.add_command(events_cli)
+
+# Order archive CLI
+orders_cli = AppGroup('orders', help='Maintain the live and archived order tables.')
+
+@orders_cli.command('archive')
+@click.option('--older-than-days', type=int, default=None, help='Defaults to ORDER_ARCHIVE_AFTER_DAYS.')
+@click.option('--batch-size', type=int, default=None, help='Defaults to ORDER_ARCHIVE_BATCH_SIZE.')
+@click.option('--max-batches', type=int, default=None, help='Stop after this many batches.')
+@click.option('--dry-run', is_flag=True, help='Only count the orders that would move.')
+def orders_archive(older_than_days, batch_size, max_batches, dry_run):
+    count = archive_orders(older_than_days, batch_size, max_batches, dry_run)
+    click.echo(f"{'Would archive' if dry_run else 'Archived'} {count} order(s)")
+
+app.cli.add_command(orders_cli)
+
 # Initialize database
 with app.app_context():
     db.create_all()
+    ensure_wishlist_unique_index()
     
     # Create admin user if not exists
     admin = User.query.filter_by(email='admin@jewelry.com').first()
@@ -0,0 +1,140 @@
+"""Micro-benchmark for product serialization.
+
+Compares the previous per-route code (ORM instances, json.loads on every list
+column, isoformat, stdlib encoder) with the column-only ProductSerializer and
+each available JSON backend, on 48-item pages of the 'detail' view. Reports
+rows/s end-to-end and for the serialize + encode step alone.
+
+    python benchmarks/serializer.py [--products 2000] [--rounds 30]
+
+Runs against a throwaway SQLite database, the development database is not touched.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+TMP_DIR = tempfile.mkdtemp(prefix='jewelry-bench-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(TMP_DIR, 'bench.db')}"
+os.environ['ARCHIVE_DATABASE_URL'] = f"sqlite:///{os.path.join(TMP_DIR, 'bench_archive.db')}"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as store  # noqa: E402
+import serializers  # noqa: E402
+
+PAGE_SIZE = 48
+
+
+def seed(count):
+    category = store.Category.query.first()
+    for i in range(count):
+        store.db.session.add(store.Product(
+            name=f"Product {i}",
+            description='Handcrafted piece ' * 20,
+            price=100 + i,
+            category_id=category.id,
+            images=json.dumps([f"/uploads/products/{i}-{n}.jpg" for n in range(4)]),
+            stock_quantity=10,
+            materials=json.dumps(['gold', 'silver', 'platinum']),
+            sizes=json.dumps(['5', '6', '7', '8', '9']),
+            colors=json.dumps(['yellow', 'white', 'rose']),
+            tags=json.dumps(['new', 'bestseller', 'gift'])
+        ))
+    store.db.session.commit()
+
+
+def legacy_fetch(offset):
+    # The per-route code this replaced
+    return Product.query.filter_by(is_active=True).order_by(Product.created_at.desc()) \
+        .offset(offset).limit(PAGE_SIZE).all()
+
+
+def legacy_render(products):
+    payload = [{
+        'id': p.id,
+        'name': p.name,
+        'description': p.description,
+        'price': p.price,
+        'originalPrice': p.original_price,
+        'category': p.category.name,
+        'images': json.loads(p.images) if p.images else [],
+        'inStock': p.in_stock,
+        'stockQuantity': p.stock_quantity,
+        'preOrder': p.pre_order,
+        'estimatedDispatch': p.estimated_dispatch.isoformat() if p.estimated_dispatch else None,
+        'materials': json.loads(p.materials) if p.materials else [],
+        'sizes': json.loads(p.sizes) if p.sizes else [],
+        'colors': json.loads(p.colors) if p.colors else [],
+        'rating': p.rating,
+        'reviewCount': p.review_count,
+        'tags': json.loads(p.tags) if p.tags else [],
+        'isFeatured': p.is_featured,
+        'createdAt': p.created_at.isoformat(),
+        'updatedAt': p.updated_at.isoformat()
+    } for p in products]
+    return json.dumps(payload, sort_keys=True, separators=(',', ':'))
+
+
+def serializer_fetch(offset):
+    serializer = serializers.product_serializer(serializers.PRODUCT_VIEWS['detail'])
+    return store.product_rows_query(serializer).filter(Product.is_active == True) \
+        .order_by(Product.created_at.desc()).offset(offset).limit(PAGE_SIZE).all()
+
+
+def serializer_render(rows):
+    serializer = serializers.product_serializer(serializers.PRODUCT_VIEWS['detail'])
+    return store.app.json.dumps(serializer.serialize_many(rows), separators=(',', ':'))
+
+
+def measure(fetch, render, pages, rounds):
+    # Returns (end-to-end rows/s, serialize + encode rows/s); the fetch is timed separately
+    # so the SQLite sort, which is the same for both paths, does not hide the CPU cost.
+    total = rendering = 0.0
+    for _ in range(rounds):
+        for offset in pages:
+            started = time.perf_counter()
+            rows = fetch(offset)
+            fetched = time.perf_counter()
+            render(rows)
+            finished = time.perf_counter()
+            store.db.session.remove()
+            total += finished - started
+            rendering += finished - fetched
+    served = len(pages) * PAGE_SIZE * rounds
+    return served / total, served / rendering
+
+
+Product = store.Product
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--products', type=int, default=2000)
+    parser.add_argument('--rounds', type=int, default=30)
+    args = parser.parse_args()
+
+    with store.app.app_context():
+        seed(args.products)
+        pages = list(range(0, min(args.products, 10 * PAGE_SIZE), PAGE_SIZE))
+        backends = ['json'] + (['orjson'] if serializers.orjson is not None else [])
+
+        results = [('before: ORM + json.loads + stdlib', measure(legacy_fetch, legacy_render, pages, args.rounds))]
+        for backend in backends:
+            store.app.json.backend = backend
+            serializers.decoded_lists.clear()
+            results.append((f"after: cold decode cache, {backend}",
+                            measure(serializer_fetch, serializer_render, pages, 1)))
+            results.append((f"after: warm decode cache, {backend}",
+                            measure(serializer_fetch, serializer_render, pages, args.rounds)))
+
+        print(f"{PAGE_SIZE}-item 'detail' pages, {len(pages)} distinct pages, rows/s\n")
+        print(f"{'':<36}{'end-to-end':>12}{'':>7}{'serialize+encode':>18}")
+        base_total, base_render = results[0][1]
+        for label, (total, rendering) in results:
+            print(f"{label:<36}{total:>12,.0f}{total / base_total:>6.1f}x{rendering:>18,.0f}{rendering / base_render:>6.1f}x")
+
+
+if __name__ == '__main__':
+    main()
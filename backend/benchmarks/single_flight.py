@@ -0,0 +1,97 @@
+"""Burst benchmark for the catalog single-flight cache.
+
+Fires N concurrent identical requests at a product detail and a product list
+endpoint, with the cache disabled and then enabled, and reports how many SQL
+statements reached the database.
+
+    python benchmarks/single_flight.py [--requests 500] [--products 200]
+
+Runs against a throwaway SQLite database, the development database is not touched.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+TMP_DIR = tempfile.mkdtemp(prefix='jewelry-bench-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(TMP_DIR, 'bench.db')}"
+os.environ['ARCHIVE_DATABASE_URL'] = f"sqlite:///{os.path.join(TMP_DIR, 'bench_archive.db')}"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event  # noqa: E402
+from sqlalchemy.engine import Engine  # noqa: E402
+
+import app as store  # noqa: E402
+
+
+def seed(count):
+    category = store.Category.query.first()
+    for i in range(count):
+        store.db.session.add(store.Product(
+            name=f"Product {i}",
+            description='Handcrafted piece ' * 20,
+            price=100 + i,
+            category_id=category.id,
+            images=json.dumps([f"/uploads/products/{i}.jpg"]),
+            stock_quantity=10,
+            materials=json.dumps(['gold', 'silver']),
+            sizes=json.dumps(['6', '7', '8']),
+            colors=json.dumps(['yellow']),
+            tags=json.dumps(['new'])
+        ))
+    store.db.session.commit()
+    return store.Product.query.first().id
+
+
+def burst(url, requests):
+    barrier = threading.Barrier(requests)
+    statuses = []
+
+    def worker():
+        client = store.app.test_client()
+        barrier.wait()
+        statuses.append(client.get(url).status_code)
+
+    threads = [threading.Thread(target=worker) for _ in range(requests)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started, statuses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--products', type=int, default=200)
+    args = parser.parse_args()
+
+    with store.app.app_context():
+        product_id = seed(args.products)
+
+    statements = []
+
+    # Catalog reads may go to the primary or the read-only engine, so count on every engine
+    @event.listens_for(Engine, 'before_cursor_execute')
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    urls = [f"/api/products/{product_id}", '/api/products?per_page=48&view=list']
+    print(f"{args.requests} concurrent requests per key\n")
+    print(f"{'cache':<10}{'endpoint':<42}{'SQL statements':>16}{'wall ms':>10}")
+    for enabled in (False, True):
+        store.app.config['CATALOG_CACHE_ENABLED'] = enabled
+        store.catalog_cache.invalidate()
+        for url in urls:
+            del statements[:]
+            elapsed, statuses = burst(url, args.requests)
+            assert all(status == 200 for status in statuses), set(statuses)
+            print(f"{'on' if enabled else 'off':<10}{url:<42}{len(statements):>16}{elapsed * 1000:>10.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+"""Product serialization shared by every route that renders products.
+
+Routes select only the columns a field set needs (as plain row tuples, no ORM
+instances) and hand the rows to a precompiled ProductSerializer. Decoded JSON
+list columns are cached per (product id, updated_at), so unchanged products
+are parsed once. FastJSONProvider writes responses with orjson when it is
+installed and falls back to the standard library otherwise.
+"""
+import json
+import threading
+from datetime import date, datetime
+from functools import lru_cache
+from operator import itemgetter
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional, the stdlib encoder is used instead
+    orjson = None
+
+json_loads = orjson.loads if orjson is not None else json.loads
+
+JSON_LIST_COLUMNS = ('images', 'materials', 'sizes', 'colors', 'tags')
+
+
+def first_item(items):
+    return items[0] if items else None
+
+
+# Response field -> (row column it reads, optional transform of the column value).
+# JSON list columns arrive already decoded. 'category_name' is not a product column;
+# the query joins Category for it.
+PRODUCT_FIELDS = {
+    'id': ('id', None),
+    'name': ('name', None),
+    'description': ('description', None),
+    'price': ('price', None),
+    'originalPrice': ('original_price', None),
+    'category': ('category_name', None),
+    'images': ('images', None),
+    'image': ('images', first_item),
+    'inStock': ('in_stock', None),
+    'stockQuantity': ('stock_quantity', None),
+    'preOrder': ('pre_order', None),
+    'estimatedDispatch': ('estimated_dispatch', None),
+    'materials': ('materials', None),
+    'sizes': ('sizes', None),
+    'colors': ('colors', None),
+    'rating': ('rating', None),
+    'reviewCount': ('review_count', None),
+    'tags': ('tags', None),
+    'isFeatured': ('is_featured', None),
+    'createdAt': ('created_at', None),
+    'updatedAt': ('updated_at', None),
+}
+
+PRODUCT_VIEWS = {
+    'card': ('id', 'name', 'price', 'image', 'rating'),
+    'list': ('id', 'name', 'price', 'originalPrice', 'category', 'images', 'inStock',
+             'preOrder', 'estimatedDispatch', 'rating', 'reviewCount', 'isFeatured'),
+    'detail': ('id', 'name', 'description', 'price', 'originalPrice', 'category', 'images',
+               'inStock', 'stockQuantity', 'preOrder', 'estimatedDispatch', 'materials',
+               'sizes', 'colors', 'rating', 'reviewCount', 'tags', 'isFeatured',
+               'createdAt', 'updatedAt'),
+    'wishlist': ('id', 'name', 'price', 'originalPrice', 'images', 'inStock', 'rating', 'reviewCount'),
+    'search': ('id', 'name', 'price', 'images', 'category'),
+    'dashboard': ('id', 'name', 'price', 'reviewCount', 'images'),
+}
+
+
+class DecodedListCache:
+    # Bounded FIFO keyed by (id, updated_at); an entry only goes stale when updated_at
+    # changes, which changes its key
+    def __init__(self, max_entries=20000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def get(self, row_id, updated_at, columns, raws):
+        entry = self._entries.get((row_id, updated_at))
+        if entry is None:
+            entry = {}
+            with self._lock:
+                self._entries[(row_id, updated_at)] = entry
+                while len(self._entries) > self.max_entries:
+                    self._entries.pop(next(iter(self._entries)), None)
+        decoded = []
+        for column, raw in zip(columns, raws):
+            value = entry.get(column)
+            if value is None:
+                value = entry[column] = json_loads(raw) if raw else []
+            decoded.append(value)
+        return decoded
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+decoded_lists = DecodedListCache()
+
+
+class ProductSerializer:
+    # Compiled once per field set: the query selects self.columns in this order, so
+    # every field is read by position and the list columns are decoded with one
+    # cache lookup per row.
+    def __init__(self, fields):
+        self.fields = fields
+        columns = {'id'} | {PRODUCT_FIELDS[name][0] for name in fields}
+        self.list_columns = tuple(column for column in JSON_LIST_COLUMNS if column in columns)
+        if self.list_columns:
+            columns.add('updated_at')  # part of the decode cache key
+        self.columns = tuple(sorted(columns))
+        self.needs_category = 'category_name' in columns
+
+        position = {column: index for index, column in enumerate(self.columns)}
+        self._id = position['id']
+        self._updated_at = position.get('updated_at')
+        self._list_positions = tuple(position[column] for column in self.list_columns)
+        indexes = [position[PRODUCT_FIELDS[name][0]] for name in fields]
+        self._pick = itemgetter(*indexes) if len(indexes) > 1 else lambda values: (values[indexes[0]],)
+        self._transforms = tuple((name, PRODUCT_FIELDS[name][1]) for name in fields if PRODUCT_FIELDS[name][1])
+
+    def serialize(self, row):
+        values = row
+        if self._list_positions:
+            values = list(row)
+            decoded = decoded_lists.get(row[self._id], row[self._updated_at], self.list_columns,
+                                        [row[index] for index in self._list_positions])
+            for index, value in zip(self._list_positions, decoded):
+                values[index] = value
+        result = dict(zip(self.fields, self._pick(values)))
+        for name, transform in self._transforms:
+            result[name] = transform(result[name])
+        return result
+
+    def serialize_many(self, rows):
+        serialize = self.serialize
+        return [serialize(row) for row in rows]
+
+
+@lru_cache(maxsize=256)
+def product_serializer(fields):
+    return ProductSerializer(tuple(fields))
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    # JSON_BACKEND: 'auto' (orjson if installed), 'orjson' or 'json'. Dates and datetimes
+    # are written as ISO 8601 by both backends.
+    def __init__(self, app):
+        super().__init__(app)
+        backend = app.config.get('JSON_BACKEND', 'auto')
+        if backend == 'orjson' and orjson is None:
+            raise RuntimeError('JSON_BACKEND is orjson but orjson is not installed')
+        self.backend = 'orjson' if backend in ('auto', 'orjson') and orjson is not None else 'json'
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, (date, datetime)):
+            return o.isoformat()
+        return DefaultJSONProvider.default(o)
+
+    def _orjson_compatible(self, kwargs):
+        return self.backend == 'orjson' and all(
+            key == 'separators' and value == (',', ':') for key, value in kwargs.items()
+        )
+
+    def _orjson_dumps(self, obj):
+        return orjson.dumps(obj, default=self.default, option=orjson.OPT_SORT_KEYS if self.sort_keys else 0)
+
+    def dumps(self, obj, **kwargs):
+        if self._orjson_compatible(kwargs):
+            return self._orjson_dumps(obj).decode()
+        return super().dumps(obj, **kwargs)
+
+    def response(self, *args, **kwargs):
+        if self.backend != 'orjson' or (self.compact is None and self._app.debug) or self.compact is False:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self._orjson_dumps(obj) + b'\n', mimetype=self.mimetype)
@@ -11,7 +11,8 @@ const Collections: React.FC = () => {
 
   useEffect(() => {
     fetchCategories();
-    fetchProducts();
+    // The grid only renders ProductCard fields, so skip descriptions, materials, sizes, etc.
+    fetchProducts({ view: 'list' });
   }, []);
 
   const filteredProducts = selectedCategory
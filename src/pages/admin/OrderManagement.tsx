@@ -49,7 +49,7 @@ const OrderManagement: React.FC = () => {
     const fetchOrders = async () => {
       try {
         setLoading(true);
-        const response = await axios.get('/api/orders');
+        const response = await axios.get('/api/orders', { params: { scope: 'active' } });
         const ordersData = response.data.map((order: any) => ({
           id: order.id,
           orderNumber: order.orderNumber,
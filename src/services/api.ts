@@ -153,8 +153,9 @@ class ApiService {
     });
   }
 
-  async getOrders() {
-    return this.request('/orders');
+  async getOrders(params: any = {}) {
+    const queryString = new URLSearchParams(params).toString();
+    return this.request(`/orders${queryString ? `?${queryString}` : ''}`);
   }
 
   async updateOrderStatus(orderId: string, statusData: any) {
@@ -164,11 +165,36 @@ class ApiService {
     });
   }
 
+  async bulkUpdateOrderStatus(orders: any[], atomic = false) {
+    return this.request('/admin/orders/bulk-status', {
+      method: 'POST',
+      body: JSON.stringify({ orders, atomic }),
+    });
+  }
+
+  async uploadTrackingFile(file: File, defaults: { status?: string; paymentStatus?: string } = {}) {
+    const formData = new FormData();
+    formData.append('file', file);
+    Object.entries(defaults).forEach(([key, value]) => value && formData.append(key, value));
+    return this.uploadRequest('/admin/orders/bulk-status', formData);
+  }
+
   // Wishlist endpoints
   async getWishlist() {
     return this.request('/wishlist');
   }
 
+  async getWishlistIds() {
+    return this.request('/wishlist/ids');
+  }
+
+  async syncWishlist(changes: { add?: string[]; remove?: string[] }) {
+    return this.request('/wishlist/sync', {
+      method: 'POST',
+      body: JSON.stringify(changes),
+    });
+  }
+
   async addToWishlist(productId: string) {
     return this.request(`/wishlist/${productId}`, {
       method: 'POST',
@@ -202,6 +228,14 @@ class ApiService {
   async search(query: string) {
     return this.request(`/search?q=${encodeURIComponent(query)}`);
   }
+
+  // Change feed (Server-Sent Events); EventSource resumes with Last-Event-ID on its own
+  subscribeToChanges(productIds: string[] = []) {
+    const params = new URLSearchParams();
+    if (productIds.length) params.set('products', productIds.join(','));
+    if (this.token) params.set('jwt', this.token);
+    return new EventSource(`${API_BASE_URL}/events?${params.toString()}`);
+  }
 }
 
 export const apiService = new ApiService();
\ No newline at end of file
@@ -49,6 +49,7 @@ interface StoreState {
   
   fetchWishlist: () => Promise<void>;
   addToWishlist: (productId: string) => Promise<void>;
+  mergeGuestWishlist: () => Promise<void>;
   removeFromWishlist: (productId: string) => Promise<void>;
   
   fetchOrders: () => Promise<void>;
@@ -93,6 +94,7 @@ export const useStore = create<StoreState>()(
             isAuthenticated: true, 
             loading: false 
           });
+          await get().mergeGuestWishlist();
           return true;
         } catch (error: any) {
           set({ error: error.message, loading: false });
@@ -121,6 +123,7 @@ export const useStore = create<StoreState>()(
             isAuthenticated: true, 
             loading: false 
           });
+          await get().mergeGuestWishlist();
           return true;
         } catch (error: any) {
           set({ error: error.message, loading: false });
@@ -246,7 +249,13 @@ export const useStore = create<StoreState>()(
       },
 
       addToWishlist: async (productId) => {
-        if (!get().isAuthenticated) return;
+        // Guests keep their wishlist locally until they log in
+        if (!get().isAuthenticated) {
+          set((state) => ({
+            wishlist: state.wishlist.includes(productId) ? state.wishlist : [...state.wishlist, productId]
+          }));
+          return;
+        }
         
         try {
           await apiService.addToWishlist(productId);
@@ -260,8 +269,25 @@ export const useStore = create<StoreState>()(
         }
       },
 
+      mergeGuestWishlist: async () => {
+        const guestWishlist = get().wishlist;
+        try {
+          const response = guestWishlist.length
+            ? await apiService.syncWishlist({ add: guestWishlist })
+            : await apiService.getWishlistIds();
+          set({ wishlist: response.productIds });
+        } catch (error: any) {
+          set({ error: error.message });
+        }
+      },
+
       removeFromWishlist: async (productId) => {
-        if (!get().isAuthenticated) return;
+        if (!get().isAuthenticated) {
+          set((state) => ({
+            wishlist: state.wishlist.filter(id => id !== productId)
+          }));
+          return;
+        }
         
         try {
           await apiService.removeFromWishlist(productId);